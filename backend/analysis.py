@@ -0,0 +1,164 @@
+# Text statistics, keyword and sentiment analysis for uploaded documents
+
+from collections import Counter
+import heapq
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+
+# Text analysis lookup tables
+PUNCTUATION = '.,!?;:"()[]{}'
+PUNCTUATION_TABLE = str.maketrans("", "", PUNCTUATION)
+LARGE_TEXT_THRESHOLD = 1024 * 1024  # 1MB
+POSITIVE_WORDS = frozenset(['good', 'great', 'excellent', 'amazing', 'wonderful', 'positive'])
+NEGATIVE_WORDS = frozenset(['bad', 'terrible', 'poor', 'negative', 'awful', 'horrible'])
+
+# Byte-level equivalents for the JIT-compiled counter
+PUNCTUATION_BYTES = np.zeros(256, dtype=np.bool_)
+PUNCTUATION_BYTES[np.frombuffer(PUNCTUATION.encode("ascii"), dtype=np.uint8)] = True
+
+# FNV-1a (64-bit) token hashing for the JIT-compiled counter
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME = np.uint64(1099511628211)
+
+@njit(cache=True)
+def _whitespace_length(data, i):
+    """Byte length of the UTF-8 whitespace character at data[i], or 0 if it
+    isn't one; covers every character str.split() splits on"""
+    c = data[i]
+    if c == 32 or (c >= 9 and c <= 13) or (c >= 28 and c <= 31):
+        return 1
+    n = data.shape[0]
+    if c == 0xC2 and i + 1 < n and (data[i + 1] == 0x85 or data[i + 1] == 0xA0):
+        return 2
+    if c >= 0xE1 and c <= 0xE3 and i + 2 < n:
+        b1 = data[i + 1]
+        b2 = data[i + 2]
+        if c == 0xE1 and b1 == 0x9A and b2 == 0x80:  # U+1680
+            return 3
+        if c == 0xE2 and b1 == 0x80 and (b2 <= 0x8A or b2 == 0xA8 or b2 == 0xA9 or b2 == 0xAF):
+            return 3  # U+2000-U+200A, U+2028, U+2029, U+202F
+        if c == 0xE2 and b1 == 0x81 and b2 == 0x9F:  # U+205F
+            return 3
+        if c == 0xE3 and b1 == 0x80 and b2 == 0x80:  # U+3000
+            return 3
+    return 0
+
+@njit(cache=True)
+def _count_token_hashes(data, punctuation):
+    """Split a UTF-8 byte array on whitespace like str.split(), dropping
+    punctuation bytes and folding ASCII case, and count the tokens by hash;
+    returns per distinct hash its count and first occurrence"""
+    slots = Dict.empty(key_type=types.uint64, value_type=types.int64)
+    counts = []
+    starts = []
+    lengths = []
+    n = data.shape[0]
+    i = 0
+    while i < n:
+        width = _whitespace_length(data, i)
+        if width:
+            i += width
+            continue
+        
+        start = i
+        h = FNV_OFFSET
+        empty = True
+        while i < n and _whitespace_length(data, i) == 0:
+            c = data[i]
+            i += 1
+            if punctuation[c]:
+                continue
+            # Fold A-Z to a-z so the raw (not lowercased) bytes can be scanned;
+            # non-ASCII case is folded when the words are decoded
+            if c >= 65 and c <= 90:
+                c |= 32
+            h ^= np.uint64(c)
+            h *= FNV_PRIME
+            empty = False
+        
+        # Runs of punctuation alone aren't tokens
+        if empty:
+            continue
+        if h in slots:
+            counts[slots[h]] += 1
+        else:
+            slots[h] = len(counts)
+            counts.append(1)
+            starts.append(start)
+            lengths.append(i - start)
+    
+    return np.array(counts), np.array(starts), np.array(lengths)
+
+def sentiment_counts(token_counts: Counter):
+    """Count positive and negative word hits"""
+    # Simple sentiment (can be enhanced with transformers)
+    pos_count = sum(token_counts[word] for word in POSITIVE_WORDS)
+    neg_count = sum(token_counts[word] for word in NEGATIVE_WORDS)
+    return pos_count, neg_count
+
+def count_tokens(text: str):
+    """Count lowercased whitespace-separated tokens, stripped of punctuation,
+    along with positive and negative sentiment hits"""
+    token_counts = Counter(text.lower().translate(PUNCTUATION_TABLE).split())
+    return (token_counts, *sentiment_counts(token_counts))
+
+def count_tokens_jit(raw):
+    """Same result as count_tokens for a large UTF-8 text (bytes or a memory
+    map, read without copying), tokenized by the Numba kernel
+    
+    Each distinct hash is decoded once from its first occurrence; spellings
+    that only differ in non-ASCII case hash apart and are merged here.
+    """
+    counts, starts, lengths = _count_token_hashes(
+        np.frombuffer(raw, dtype=np.uint8), PUNCTUATION_BYTES
+    )
+    
+    token_counts = Counter()
+    for count, start, length in zip(counts.tolist(), starts.tolist(), lengths.tolist()):
+        word = raw[start:start + length].decode("utf-8").lower().translate(PUNCTUATION_TABLE)
+        token_counts[word] += count
+    
+    return (token_counts, *sentiment_counts(token_counts))
+
+def analyze_text(text: str, raw=None) -> dict:
+    """Perform statistical analysis on text
+    
+    raw optionally holds the UTF-8 encoding of text (e.g. a memory map of the
+    persisted file), letting large texts skip re-encoding for token counting.
+    """
+    words = text.split()
+    sentences = text.split('.')
+    paragraphs = text.split('\n\n')
+    
+    # Single counting pass shared by keyword and sentiment extraction;
+    # very large texts go through the JIT-compiled byte-level counter
+    if len(text) > LARGE_TEXT_THRESHOLD:
+        token_counts, pos_count, neg_count = count_tokens_jit(
+            raw if raw is not None else text.encode("utf-8")
+        )
+    else:
+        token_counts, pos_count, neg_count = count_tokens(text)
+    
+    top_keywords = heapq.nlargest(
+        10,
+        ((word, count) for word, count in token_counts.items() if len(word) > 3),
+        key=lambda x: x[1]
+    )
+    
+    if pos_count > neg_count:
+        sentiment = "Positive"
+    elif neg_count > pos_count:
+        sentiment = "Negative"
+    else:
+        sentiment = "Neutral"
+    
+    return {
+        "word_count": len(words),
+        "sentence_count": len([s for s in sentences if s.strip()]),
+        "paragraph_count": len([p for p in paragraphs if p.strip()]),
+        "avg_words_per_sentence": round(len(words) / max(len(sentences), 1), 1),
+        "top_keywords": [{"word": word, "count": count} for word, count in top_keywords],
+        "reading_time": max(1, len(words) // 200),
+        "sentiment": sentiment
+    }
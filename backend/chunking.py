@@ -0,0 +1,64 @@
+# Offset-based text chunking for document ingest
+
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def _chunk_offsets(n, breaks, bounds, chunk_size, overlap):
+    """Greedily pack [start, end) windows of up to chunk_size characters with
+    the given overlap
+    
+    breaks (newlines, periods) and bounds (breaks and whitespace) are sorted
+    character positions. A window ends after the last break in its second
+    half, else after the last bound there, and the next window starts right
+    after a bound, so only words longer than half a chunk are ever cut.
+    """
+    starts = []
+    ends = []
+    start = 0
+    while start < n:
+        end = min(start + chunk_size, n)
+        at_bound = True
+        if end < n:
+            # Last newline/period inside the window, if it keeps the chunk at
+            # least half full, else the last whitespace
+            half = start + chunk_size // 2
+            i = np.searchsorted(breaks, end) - 1
+            j = np.searchsorted(bounds, end) - 1
+            if i >= 0 and breaks[i] >= half:
+                end = breaks[i] + 1
+            elif j >= 0 and bounds[j] >= half:
+                end = bounds[j] + 1
+            else:
+                at_bound = False
+        
+        starts.append(start)
+        ends.append(end)
+        if end >= n:
+            break
+        
+        # Overlap from the first word start among the last `overlap` characters.
+        # A window cut mid-word keeps its character overlap, as the recursive
+        # splitter's character-level fallback does
+        next_start = max(end - overlap, start + 1)
+        j = np.searchsorted(bounds, next_start - 1)
+        if j < bounds.shape[0] and bounds[j] + 1 < end:
+            next_start = bounds[j] + 1
+        elif at_bound:
+            next_start = end
+        start = next_start
+    
+    return starts, ends
+
+def chunk_spans(text: str, chunk_size: int, overlap: int):
+    """Return the [start, end) character spans of the overlapping chunks of text"""
+    if not text:
+        return []
+    
+    # UTF-32 gives one array element per character, so offsets index the str directly
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    is_break = (codes == 10) | (codes == 46)
+    breaks = np.flatnonzero(is_break)
+    bounds = np.flatnonzero(is_break | (codes == 32) | (codes == 9) | (codes == 13))
+    starts, ends = _chunk_offsets(len(codes), breaks, bounds, chunk_size, overlap)
+    return list(zip(starts, ends))
@@ -0,0 +1,22 @@
+# Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for CPU inference
+# Requirements: pip install optimum onnxruntime
+# Run once from backend/: python export_onnx.py
+
+import os
+
+from optimum.exporters.onnx import main_export
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx")
+
+if __name__ == "__main__":
+    # Writes model.onnx plus the tokenizer files main.py loads
+    main_export(EMBEDDING_MODEL, output=ONNX_MODEL_DIR, task="feature-extraction")
+
+    quantize_dynamic(
+        os.path.join(ONNX_MODEL_DIR, "model.onnx"),
+        os.path.join(ONNX_MODEL_DIR, "model.int8.onnx"),
+        weight_type=QuantType.QInt8
+    )
+    print(f"Quantized model written to {ONNX_MODEL_DIR}/model.int8.onnx")
@@ -1,32 +1,61 @@
 # Document Intelligence Platform - Production Backend
 # Requirements: pip install fastapi uvicorn langchain langchain-community langchain-openai 
-#               chromadb pypdf python-multipart sentence-transformers openai
+#               faiss-cpu pypdf python-multipart sentence-transformers openai numpy torch numba
+#               aiofiles pymupdf sqlite-vec onnxruntime orjson
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from collections import OrderedDict
+from abc import ABC, abstractmethod
 import os
 import uuid
+import hashlib
+import asyncio
+import mmap
+import time
+import sqlite3
+import sqlite_vec
+from concurrent.futures import ThreadPoolExecutor
+import aiofiles
 from datetime import datetime
+import numpy as np
 
 # LangChain imports
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+
+# Embedding model
+import torch
+import onnxruntime as ort
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
 
 # Document processing
-import chromadb
-from chromadb.config import Settings
-import shutil
+import fitz  # PyMuPDF
+import faiss
+import json
+import threading
 import tempfile
+from contextlib import contextmanager
+
+# Text analysis and chunking
+from analysis import analyze_text
+from chunking import chunk_spans
 
 # Initialize FastAPI
-app = FastAPI(title="Document Intelligence API", version="1.0.0")
+app = FastAPI(
+    title="Document Intelligence API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # CORS configuration for production
 app.add_middleware(
@@ -37,25 +66,378 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """Gzip responses except the streamed /query answers, which the
+    compressor would otherwise buffer instead of sending token by token"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/query":
+            await self.app(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+# Compress large payloads (document lists, analyses)
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024)
+
 # Configuration
 UPLOAD_DIR = "uploads"
 VECTOR_DB_DIR = "vector_db"
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(VECTOR_DB_DIR, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+
+# Text chunking; set FAST_SPLITTER=0 to fall back to LangChain's recursive splitter
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+USE_FAST_SPLITTER = os.getenv("FAST_SPLITTER", "1") == "1"
+
+# Worker pool for CPU-bound document processing, keeps the event loop free
+executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Maximum number of documents ingested concurrently (bounds memory)
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+ingest_semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+# Cross-document embedding batches: flush when this many chunks are pending
+# or after the flush interval, whichever comes first
+EMBEDDING_FLUSH_SIZE = 512
+EMBEDDING_FLUSH_INTERVAL = 0.05  # seconds
+EMBEDDING_FLUSH_BATCH_SIZE = 128
+
+# Chunk embedding cache keyed by SHA-1 of the encoder id and normalized chunk
+# text, so duplicate chunks (re-uploads, boilerplate) are never re-encoded;
+# the cap applies both in memory and to the persisted table
+EMBEDDING_CACHE_SIZE = 100_000  # ~150MB of 384-dim float32 vectors
 
 # OpenAI API Key (set as environment variable)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here")
 
-# Initialize embeddings (using free HuggingFace model)
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
+# Initialize LLM once so its HTTP client and connections are reused across
+# requests (using OpenAI - you can switch to local models)
+llm = ChatOpenAI(
+    model_name="gpt-3.5-turbo",
+    temperature=0.3,
+    openai_api_key=OPENAI_API_KEY,
+    streaming=True
 )
 
+# Alternative: Use local model with Ollama or HuggingFace
+# from langchain_community.llms import Ollama
+# llm = Ollama(model="llama2")
+
+# Initialize embeddings (using free HuggingFace model)
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+EMBEDDING_BATCH_SIZE = 64
+
+# Quantized ONNX export of the model (see export_onnx.py), used on CPU-only hosts
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx")
+ONNX_MODEL_PATH = os.path.join(ONNX_MODEL_DIR, "model.int8.onnx")
+EMBEDDING_MAX_LENGTH = 256
+
+class BatchEmbeddings(Embeddings, ABC):
+    """LangChain embeddings interface over a batched, normalized encode()"""
+    
+    # Identifies the encoder so cached vectors from different models never mix
+    model_id: str
+    
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Return L2-normalized float32 embeddings, one row per text"""
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+class SentenceTransformerEmbeddings(BatchEmbeddings):
+    """Batched SentenceTransformer encoder, on GPU when available"""
+    
+    def __init__(self, model_name: str, batch_size: int = EMBEDDING_BATCH_SIZE):
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device == "cpu":
+            torch.set_num_threads(os.cpu_count() or 1)
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_id = f"sentence-transformers:{model_name}"
+        self.batch_size = batch_size
+    
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+
+class OnnxEmbeddings(BatchEmbeddings):
+    """Int8-quantized MiniLM on ONNX Runtime using every CPU core, with the
+    same mean pooling and normalization as SentenceTransformer"""
+    
+    def __init__(self, model_dir: str, model_path: str, batch_size: int = EMBEDDING_BATCH_SIZE):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model_id = f"onnx-int8:{os.path.abspath(model_path)}"
+        self.batch_size = batch_size
+    
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        batch_size = batch_size or self.batch_size
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=EMBEDDING_MAX_LENGTH,
+                return_tensors="np"
+            )
+            inputs = {name: value for name, value in encoded.items() if name in self.input_names}
+            hidden = self.session.run(None, inputs)[0]
+            
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            vectors.append(pooled.astype(np.float32))
+        
+        if not vectors:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        return np.vstack(vectors)
+
+# Same model instance serves both upload (chunks) and query paths; CPU-only
+# hosts use the quantized ONNX model when it has been exported
+if not torch.cuda.is_available() and os.path.exists(ONNX_MODEL_PATH):
+    embeddings = OnnxEmbeddings(ONNX_MODEL_DIR, ONNX_MODEL_PATH)
+else:
+    embeddings = SentenceTransformerEmbeddings(EMBEDDING_MODEL)
+
+class EmbeddingBatcher:
+    """Coalesce chunk texts from concurrent uploads into shared encoder batches"""
+    
+    def __init__(self, flush_size: int, flush_interval: float):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = []  # (texts, future) pairs
+        self.pending_count = 0
+        self.timer = None
+    
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((texts, future))
+        self.pending_count += len(texts)
+        
+        if self.pending_count >= self.flush_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.flush_interval, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        
+        batch, self.pending, self.pending_count = self.pending, [], 0
+        asyncio.ensure_future(self._encode(batch))
+    
+    async def _encode(self, batch):
+        texts = [text for batch_texts, _ in batch for text in batch_texts]
+        try:
+            vectors = await run_blocking(encode_chunks, texts, EMBEDDING_FLUSH_BATCH_SIZE)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        offset = 0
+        for batch_texts, future in batch:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(batch_texts)])
+            offset += len(batch_texts)
+
+embedding_batcher = EmbeddingBatcher(EMBEDDING_FLUSH_SIZE, EMBEDDING_FLUSH_INTERVAL)
+
 # Alternative: Use OpenAI embeddings (requires API key)
 # embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
 
-# Document storage
-documents_db = {}
+# Shared vector index: one FAISS HNSW graph over all chunks (inner product on
+# normalized vectors), chunk text and doc_id live in SQLite keyed by FAISS id
+FAISS_INDEX_PATH = os.path.join(VECTOR_DB_DIR, "index.faiss")
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# Documents up to this many chunks are searched exactly over their own vectors;
+# filtered HNSW search only sees selected ids that fall inside its beam
+EXACT_SEARCH_MAX_CHUNKS = 4096
+
+# Document storage: metadata and the persisted query cache live in SQLite so
+# they survive restarts; sqlite-vec stores the cached query embeddings
+db = sqlite3.connect(STATE_DB_PATH, check_same_thread=False)
+# The connection is shared by the worker threads; every use of it, reads
+# included, must hold this lock. Async handlers reach it only through
+# run_blocking, so a long write never stalls the event loop
+db_lock = threading.RLock()
+db.row_factory = sqlite3.Row
+db.execute("PRAGMA journal_mode=WAL")
+db.enable_load_extension(True)
+sqlite_vec.load(db)
+db.enable_load_extension(False)
+db.executescript(f"""
+    CREATE TABLE IF NOT EXISTS documents (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        upload_date TEXT NOT NULL,
+        word_count INTEGER NOT NULL,
+        size TEXT NOT NULL,
+        status TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        full_text_path TEXT NOT NULL,
+        analysis TEXT
+    );
+    CREATE TABLE IF NOT EXISTS query_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        doc_id TEXT NOT NULL,
+        query_hash TEXT NOT NULL,
+        response TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_cache_doc ON query_cache (doc_id);
+    CREATE VIRTUAL TABLE IF NOT EXISTS query_cache_vec USING vec0(
+        embedding float[{EMBEDDING_DIM}]
+    );
+    CREATE TABLE IF NOT EXISTS chunks (
+        id INTEGER PRIMARY KEY,
+        doc_id TEXT NOT NULL,
+        content TEXT NOT NULL,
+        metadata TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks (doc_id);
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        hash BLOB PRIMARY KEY,
+        embedding BLOB NOT NULL,
+        last_used INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_embedding_cache_used ON embedding_cache (last_used);
+""")
+# Databases created before the analysis column existed
+if "analysis" not in [row["name"] for row in db.execute("PRAGMA table_info(documents)")]:
+    db.execute("ALTER TABLE documents ADD COLUMN analysis TEXT")
+db.commit()
+
+# Load the last index checkpoint
+if os.path.exists(FAISS_INDEX_PATH):
+    index = faiss.read_index(FAISS_INDEX_PATH)
+else:
+    index = faiss.IndexHNSWFlat(EMBEDDING_DIM, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+index.hnsw.efSearch = HNSW_EF_SEARCH
+index_saved_ntotal = index.ntotal
+
+# Chunks added after that checkpoint lost their vectors if the process died
+# before the next one. Drop every chunk of the affected documents (new ids
+# start at ntotal again) and mark them for re-indexing at startup
+with db:
+    stale_docs = [
+        row["doc_id"]
+        for row in db.execute("SELECT DISTINCT doc_id FROM chunks WHERE id >= ?", (index.ntotal,))
+    ]
+    db.executemany("DELETE FROM chunks WHERE doc_id = ?", [(doc_id,) for doc_id in stale_docs])
+    db.executemany(
+        "UPDATE documents SET status = 'reindexing' WHERE id = ?",
+        [(doc_id,) for doc_id in stale_docs]
+    )
+
+class ReadWriteLock:
+    """Shared lock for readers, exclusive for writers; waiting writers go first"""
+    
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writing = False
+        self.writers_waiting = 0
+    
+    @contextmanager
+    def read(self):
+        with self.cond:
+            while self.writing or self.writers_waiting:
+                self.cond.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        with self.cond:
+            self.writers_waiting += 1
+            while self.writing or self.readers:
+                self.cond.wait()
+            self.writers_waiting -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.writing = False
+                self.cond.notify_all()
+
+# FAISS searches can run concurrently, but an add must exclude them. Adds are
+# serialized separately so each one's sequential ids match its chunk rows
+index_lock = ReadWriteLock()
+index_add_lock = threading.Lock()
+
+# The index is checkpointed INDEX_SAVE_INTERVAL seconds after the first unsaved
+# add (coalescing the adds in between into one write) and on shutdown
+INDEX_SAVE_INTERVAL = float(os.getenv("INDEX_SAVE_INTERVAL", "60"))
+index_save_lock = threading.Lock()
+index_save_timer = None
+index_save_timer_lock = threading.Lock()
+
+# In-memory LRU in front of the persisted embedding_cache table
+embedding_cache = OrderedDict()
+embedding_cache_lock = threading.Lock()
+
+# Query cache: exact (doc_id, query hash) lookups plus a per-document
+# semantic tier over query embeddings, sharing one LRU cap
+QUERY_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.95
+query_cache = OrderedDict()
+semantic_cache = {}  # doc_id -> {"keys": list of query_cache keys, "embeddings": float32 np.ndarray}
+
+# Below this retrieval confidence the LLM is skipped
+MIN_ANSWER_CONFIDENCE = 0.4
+LOW_CONFIDENCE_ANSWER = "I don't have enough context in this document."
+
+# RAG prompt: the static instructions come first and the per-request context
+# and question last, so every call shares a byte-identical prefix that the
+# LLM provider's prompt cache can reuse
+QA_PROMPT = PromptTemplate(
+    template=(
+        "You are a document question-answering assistant.\n"
+        "Rules:\n"
+        "- Answer only from the context provided below.\n"
+        "- If you don't know the answer, just say that you don't know, "
+        "don't try to make up an answer.\n"
+        "- Keep answers concise and factual.\n"
+        "\n---\n\n"
+        "Context:\n{context}\n\n"
+        "Question: {question}\n"
+        "Answer:"
+    ),
+    input_variables=["context", "question"]
+)
 
 # Pydantic models
 class DocumentResponse(BaseModel):
@@ -66,6 +448,11 @@ class DocumentResponse(BaseModel):
     size: str
     status: str
 
+class BatchUploadResult(BaseModel):
+    filename: str
+    document: Optional[DocumentResponse] = None
+    error: Optional[str] = None
+
 class QueryRequest(BaseModel):
     document_id: str
     query: str
@@ -85,98 +472,479 @@ class AnalysisResponse(BaseModel):
     sentiment: str
 
 # Helper functions
-def process_document(file_path: str, file_type: str):
-    """Load and split document into chunks"""
+def search_chunks(doc_id: str, query_embedding: np.ndarray, k: int = 3):
+    """Return the k chunks of a document nearest to the query embedding,
+    with their cosine similarities"""
+    with db_lock:
+        rows = db.execute("SELECT id FROM chunks WHERE doc_id = ?", (doc_id,)).fetchall()
+    ids = np.array([row["id"] for row in rows], dtype=np.int64)
+    if len(ids) == 0:
+        return [], []
+    
+    query = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
+    faiss.normalize_L2(query)
+    k = min(k, len(ids))
+    
+    labels = scores = None
+    if len(ids) > EXACT_SEARCH_MAX_CHUNKS:
+        selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=HNSW_EF_SEARCH)
+        with index_lock.read():
+            scores, labels = index.search(query, k, params=params)
+        labels, scores = labels[0], scores[0]
+        if (labels >= 0).sum() < k:
+            labels = scores = None
+    
+    # Small documents, or a filtered search that came back short: score every
+    # vector of the document exactly
+    if labels is None:
+        with index_lock.read():
+            vectors = index.reconstruct_batch(ids)
+        all_scores = vectors @ query[0]
+        top = np.argpartition(-all_scores, k - 1)[:k]
+        labels, scores = ids[top], all_scores[top]
+    
+    # Return chunks in id order so identical retrievals build identical prompts
+    hits = sorted(
+        (int(label), float(score)) for label, score in zip(labels, scores) if label >= 0
+    )
+    if not hits:
+        return [], []
+    
+    with db_lock:
+        rows = {
+            row["id"]: row
+            for row in db.execute(
+                f"SELECT * FROM chunks WHERE id IN ({','.join('?' * len(hits))})",
+                [i for i, _ in hits]
+            ).fetchall()
+        }
+    hits = [(i, score) for i, score in hits if i in rows]
+    documents = [
+        Document(page_content=rows[i]["content"], metadata=json.loads(rows[i]["metadata"]))
+        for i, _ in hits
+    ]
+    return documents, [score for _, score in hits]
+
+def retrieval_confidence(scores: List[float]) -> float:
+    """Mean cosine similarity of the retrieved chunks, clipped to [0, 1]"""
+    if not scores:
+        return 0.0
+    return float(np.clip(np.mean(scores[:3]), 0.0, 1.0))
+
+async def stream_answer(doc_id: str, cache_key: tuple, query_embedding: np.ndarray,
+                        question: str, source_documents: List[Document], confidence: float):
+    """Stream LLM tokens as NDJSON, then emit and cache the complete response"""
     try:
-        if file_type == "pdf":
-            loader = PyPDFLoader(file_path)
-        else:
-            loader = TextLoader(file_path)
+        context = "\n\n".join(doc.page_content for doc in source_documents)
+        prompt = QA_PROMPT.format(context=context, question=question)
         
-        documents = loader.load()
+        tokens = []
+        async for chunk in llm.astream(prompt):
+            tokens.append(chunk.content)
+            yield json.dumps({"token": chunk.content}) + "\n"
         
-        # Split text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
+        # Extract source documents
+        source_docs = [doc.page_content[:200] + "..." for doc in source_documents]
+        
+        response = QueryResponse(
+            answer="".join(tokens),
+            source_documents=source_docs,
+            confidence=confidence
         )
+        await store_query_cache(doc_id, cache_key, query_embedding, response)
         
-        chunks = text_splitter.split_documents(documents)
-        return chunks, documents[0].page_content if documents else ""
+        yield response.model_dump_json() + "\n"
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+        yield json.dumps({"error": str(e)}) + "\n"
 
-def create_vector_store(doc_id: str, chunks):
-    """Create ChromaDB vector store for document"""
-    try:
-        persist_directory = os.path.join(VECTOR_DB_DIR, doc_id)
+def save_index():
+    """Checkpoint the FAISS index if it has unsaved adds
+    
+    The index is written to a temporary file in VECTOR_DB_DIR and swapped in,
+    so a crash mid-write leaves the previous checkpoint intact. Searches keep
+    running during the write; only adds wait for it.
+    """
+    global index_saved_ntotal, index_save_timer
+    with index_save_timer_lock:
+        if index_save_timer is not None:
+            index_save_timer.cancel()
+            index_save_timer = None
+    
+    with index_save_lock, index_lock.read():
+        ntotal = index.ntotal
+        if ntotal == index_saved_ntotal:
+            return
         
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=persist_directory
+        fd, tmp_path = tempfile.mkstemp(dir=VECTOR_DB_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, FAISS_INDEX_PATH)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        index_saved_ntotal = ntotal
+
+def schedule_index_save():
+    """Checkpoint the index INDEX_SAVE_INTERVAL seconds from now, unless a
+    checkpoint is already pending"""
+    global index_save_timer
+    with index_save_timer_lock:
+        if index_save_timer is None:
+            index_save_timer = threading.Timer(INDEX_SAVE_INTERVAL, save_index)
+            index_save_timer.daemon = True
+            index_save_timer.start()
+
+def full_text_path(doc_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{doc_id}.full.txt")
+
+def analyze_full_text(path: str, text: Optional[str] = None) -> dict:
+    """Analyze a persisted document text, feeding the token counter straight
+    from a read-only memory map of the file"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return analyze_text("")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if text is None:
+                text = str(mapped, "utf-8")
+            return analyze_text(text, mapped)
+
+async def run_blocking(func, *args):
+    """Run a blocking function on the worker pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+def get_document(doc_id: str) -> Optional[dict]:
+    with db_lock:
+        row = db.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+    return dict(row) if row else None
+
+def save_document(doc: dict):
+    with db_lock, db:
+        db.execute(
+            """INSERT OR REPLACE INTO documents
+               (id, name, upload_date, word_count, size, status, file_path,
+                full_text_path, analysis)
+               VALUES (:id, :name, :upload_date, :word_count, :size, :status,
+                       :file_path, :full_text_path, :analysis)""",
+            doc
         )
-        
-        return vectorstore
+
+def save_analysis(doc_id: str, analysis: dict):
+    with db_lock, db:
+        db.execute(
+            "UPDATE documents SET analysis = ? WHERE id = ?",
+            (json.dumps(analysis), doc_id)
+        )
+
+def remove_document(doc_id: str):
+    """Delete a document with its chunks and persisted cached responses"""
+    with db_lock, db:
+        # HNSW can't remove vectors, but they are no longer selectable once
+        # their rows are gone
+        db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+        db.execute(
+            "DELETE FROM query_cache_vec WHERE rowid IN (SELECT id FROM query_cache WHERE doc_id = ?)",
+            (doc_id,)
+        )
+        db.execute("DELETE FROM query_cache WHERE doc_id = ?", (doc_id,))
+        db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+def list_document_rows() -> List[dict]:
+    with db_lock:
+        rows = db.execute(
+            "SELECT id, name, upload_date, word_count, size, status FROM documents ORDER BY upload_date"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def chunk_hash(text: str) -> bytes:
+    key = f"{embeddings.model_id}\0{' '.join(text.split())}"
+    return hashlib.sha1(key.encode("utf-8")).digest()
+
+def encode_chunks(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """Embed chunk texts, encoding only those not already in the embedding cache"""
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating vector store: {str(e)}")
+    hashes = [chunk_hash(text) for text in texts]
+    vectors = {}
+    with embedding_cache_lock:
+        for h in hashes:
+            if h in embedding_cache:
+                embedding_cache.move_to_end(h)
+                vectors[h] = embedding_cache[h]
+    
+    # Fall back to the persisted cache, in batches under SQLite's variable limit
+    missing = [h for h in dict.fromkeys(hashes) if h not in vectors]
+    loaded = {}
+    for i in range(0, len(missing), 500):
+        batch = missing[i:i + 500]
+        with db_lock:
+            rows = db.execute(
+                f"SELECT hash, embedding FROM embedding_cache WHERE hash IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+        for row in rows:
+            loaded[row["hash"]] = np.frombuffer(row["embedding"], dtype=np.float32)
+    vectors.update(loaded)
+    
+    # Encode each distinct uncached text once
+    to_encode = {}
+    for h, text in zip(hashes, texts):
+        if h not in vectors and h not in to_encode:
+            to_encode[h] = text
+    new_vectors = {}
+    if to_encode:
+        encoded = embeddings.encode(list(to_encode.values()), batch_size)
+        new_vectors = dict(zip(to_encode, np.asarray(encoded, dtype=np.float32)))
+        vectors.update(new_vectors)
+    
+    # Persist new vectors, refresh recency of the ones read back, and trim the
+    # table to the least recently used entries beyond the cap
+    if loaded or new_vectors:
+        now = time.time_ns()
+        with db_lock, db:
+            db.executemany(
+                "UPDATE embedding_cache SET last_used = ? WHERE hash = ?",
+                [(now, h) for h in loaded]
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (hash, embedding, last_used) VALUES (?, ?, ?)",
+                [(h, v.tobytes(), now) for h, v in new_vectors.items()]
+            )
+            excess = db.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0] - EMBEDDING_CACHE_SIZE
+            if excess > 0:
+                db.execute(
+                    """DELETE FROM embedding_cache WHERE hash IN
+                       (SELECT hash FROM embedding_cache ORDER BY last_used LIMIT ?)""",
+                    (excess,)
+                )
+    loaded.update(new_vectors)
+    
+    # Promote everything that wasn't already in memory into the LRU
+    with embedding_cache_lock:
+        for h, vector in loaded.items():
+            embedding_cache[h] = vector
+            embedding_cache.move_to_end(h)
+        while len(embedding_cache) > EMBEDDING_CACHE_SIZE:
+            embedding_cache.popitem(last=False)
+    
+    return np.vstack([vectors[h] for h in hashes])
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries match"""
+    return " ".join(query.lower().split())
+
+def query_cache_key(doc_id: str, norm_query: str) -> tuple:
+    return (doc_id, hashlib.sha256(norm_query.encode("utf-8")).hexdigest())
 
-def analyze_text(text: str) -> dict:
-    """Perform statistical analysis on text"""
-    words = text.split()
-    sentences = text.split('.')
-    paragraphs = text.split('\n\n')
+def lookup_semantic_cache(doc_id: str, query_embedding: np.ndarray):
+    """Return the cached response of the most similar previous query, if close enough"""
+    entry = semantic_cache.get(doc_id)
+    if entry is None:
+        return None
     
-    # Word frequency
-    word_freq = {}
-    for word in words:
-        clean_word = word.lower().strip('.,!?;:"()[]{}')
-        if len(clean_word) > 3:
-            word_freq[clean_word] = word_freq.get(clean_word, 0) + 1
+    # Rows are unit length, so one BLAS matrix-vector product gives cosines
+    query = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+    sims = entry["embeddings"] @ query.astype(np.float32)
+    best = int(np.argmax(sims))
     
-    top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+    if sims[best] > SEMANTIC_CACHE_THRESHOLD:
+        key = entry["keys"][best]
+        query_cache.move_to_end(key)
+        return query_cache[key]
+    return None
+
+def drop_semantic_row(key: tuple):
+    """Remove the semantic-tier row belonging to an exact cache entry"""
+    entry = semantic_cache.get(key[0])
+    if entry is None or key not in entry["keys"]:
+        return
     
-    # Simple sentiment (can be enhanced with transformers)
-    positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'positive']
-    negative_words = ['bad', 'terrible', 'poor', 'negative', 'awful', 'horrible']
+    i = entry["keys"].index(key)
+    del entry["keys"][i]
+    entry["embeddings"] = np.delete(entry["embeddings"], i, axis=0)
+    if not entry["keys"]:
+        del semantic_cache[key[0]]
+
+def cache_in_memory(doc_id: str, key: tuple, query_embedding: np.ndarray, response):
+    """Add a response to both in-memory cache tiers under one global LRU cap
     
-    pos_count = sum(1 for word in words if word.lower() in positive_words)
-    neg_count = sum(1 for word in words if word.lower() in negative_words)
+    The exact tier owns recency and eviction; each semantic row points at its
+    exact entry and is evicted with it.
+    """
+    if key in query_cache:
+        drop_semantic_row(key)
+    query_cache[key] = response
+    query_cache.move_to_end(key)
     
-    if pos_count > neg_count:
-        sentiment = "Positive"
-    elif neg_count > pos_count:
-        sentiment = "Negative"
+    # Semantic tier keeps pre-normalized float32 rows aligned with their keys;
+    # at the cache cap this is only ~1.5MB, and NumPy has no half-precision
+    # GEMM that would make fp16 storage pay off
+    row = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+    row = row.astype(np.float32).reshape(1, -1)
+    entry = semantic_cache.get(doc_id)
+    if entry is None:
+        semantic_cache[doc_id] = {"keys": [key], "embeddings": row}
     else:
-        sentiment = "Neutral"
+        entry["keys"].append(key)
+        entry["embeddings"] = np.vstack([entry["embeddings"], row])
     
-    return {
-        "word_count": len(words),
-        "sentence_count": len([s for s in sentences if s.strip()]),
-        "paragraph_count": len([p for p in paragraphs if p.strip()]),
-        "avg_words_per_sentence": round(len(words) / max(len(sentences), 1), 1),
-        "top_keywords": [{"word": word, "count": count} for word, count in top_keywords],
-        "reading_time": max(1, len(words) // 200),
-        "sentiment": sentiment
-    }
+    while len(query_cache) > QUERY_CACHE_SIZE:
+        evicted, _ = query_cache.popitem(last=False)
+        drop_semantic_row(evicted)
 
-# API Endpoints
+async def store_query_cache(doc_id: str, key: tuple, query_embedding: np.ndarray, response):
+    """Cache a response in memory and persist it"""
+    cache_in_memory(doc_id, key, query_embedding, response)
+    await run_blocking(persist_query_cache, doc_id, key, query_embedding, response)
 
-@app.get("/")
-def root():
-    return {
-        "message": "Document Intelligence API",
-        "version": "1.0.0",
-        "endpoints": ["/upload", "/query", "/documents", "/analyze/{doc_id}"]
-    }
+def persist_query_cache(doc_id: str, key: tuple, query_embedding: np.ndarray, response):
+    """Persist a cached response, keeping only the newest entries on disk"""
+    with db_lock, db:
+        cursor = db.execute(
+            "INSERT INTO query_cache (doc_id, query_hash, response) VALUES (?, ?, ?)",
+            (doc_id, key[1], response.model_dump_json())
+        )
+        row_id = cursor.lastrowid
+        db.execute(
+            "INSERT INTO query_cache_vec (rowid, embedding) VALUES (?, ?)",
+            (row_id, query_embedding.astype(np.float32).tobytes())
+        )
+        db.execute("DELETE FROM query_cache WHERE id <= ?", (row_id - QUERY_CACHE_SIZE,))
+        db.execute("DELETE FROM query_cache_vec WHERE rowid <= ?", (row_id - QUERY_CACHE_SIZE,))
 
-@app.post("/upload", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...)):
-    """Upload and process a document"""
+def load_query_cache():
+    """Warm the in-memory cache tiers from the persisted entries"""
+    with db_lock:
+        rows = db.execute(
+            """SELECT q.doc_id, q.query_hash, q.response, v.embedding
+               FROM query_cache q JOIN query_cache_vec v ON v.rowid = q.id
+               ORDER BY q.id"""
+        ).fetchall()
+    for row in rows:
+        cache_in_memory(
+            row["doc_id"],
+            (row["doc_id"], row["query_hash"]),
+            np.frombuffer(row["embedding"], dtype=np.float32),
+            QueryResponse.model_validate_json(row["response"])
+        )
+
+def clear_query_cache(doc_id: str):
+    """Drop every in-memory cached response for a document; remove_document
+    deletes the persisted ones"""
+    for key in [k for k in query_cache if k[0] == doc_id]:
+        del query_cache[key]
+    semantic_cache.pop(doc_id, None)
+
+def load_pdf(file_path: str) -> List[Document]:
+    """Extract PDF pages with PyMuPDF, falling back to pypdf if MuPDF can't open the file"""
+    try:
+        pdf = fitz.open(file_path)
+    except Exception:
+        return PyPDFLoader(file_path).load()
+    
+    with pdf:
+        return [
+            Document(page_content=page.get_text("text"), metadata={"source": file_path, "page": i})
+            for i, page in enumerate(pdf)
+        ]
+
+def split_documents_fast(documents: List[Document], chunk_size: int = CHUNK_SIZE,
+                         chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+    """Split documents into overlapping chunks using NumPy break detection
+    and the JIT-compiled packer in chunking.py"""
+    chunks = []
+    for document in documents:
+        text = document.page_content
+        if not text:
+            continue
+        
+        for start, end in chunk_spans(text, chunk_size, chunk_overlap):
+            content = text[start:end].strip()
+            if content:
+                chunks.append(Document(page_content=content, metadata=dict(document.metadata)))
+    
+    return chunks
+
+def process_document(file_path: str, file_type: str):
+    """Load and split document into chunks"""
+    try:
+        if file_type == "pdf":
+            documents = load_pdf(file_path)
+        else:
+            documents = TextLoader(file_path).load()
+        
+        # Split text into chunks
+        if USE_FAST_SPLITTER:
+            chunks = split_documents_fast(documents)
+        else:
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                length_function=len
+            )
+            chunks = text_splitter.split_documents(documents)
+        
+        return chunks, documents[0].page_content if documents else ""
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+
+def create_vector_store(doc_id: str, chunks, chunk_embeddings: Optional[np.ndarray] = None):
+    """Embed document chunks (unless precomputed) and add them to the shared index"""
     try:
+        if not chunks:
+            return
+        
+        texts = [chunk.page_content for chunk in chunks]
+        if chunk_embeddings is None:
+            chunk_embeddings = encode_chunks(texts)
+        
+        vectors = np.ascontiguousarray(chunk_embeddings, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        
+        # FAISS assigns sequential ids, so the rows are written under the add
+        # lock. Searches only select ids that have rows, so they may run as
+        # soon as the vectors are in
+        with index_add_lock:
+            with index_lock.write():
+                start = index.ntotal
+                index.add(vectors)
+            with db_lock, db:
+                db.executemany(
+                    "INSERT INTO chunks (id, doc_id, content, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (start + i, doc_id, chunk.page_content, json.dumps(chunk.metadata))
+                        for i, chunk in enumerate(chunks)
+                    ]
+                )
+        schedule_index_save()
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating vector store: {str(e)}")
+
+def reindex_document(doc_id: str):
+    """Rebuild the chunks of a document whose vectors were lost in a crash"""
+    doc = get_document(doc_id)
+    if doc is None:
+        return
+    
+    file_type = "pdf" if doc["file_path"].split('.')[-1].lower() == "pdf" else "txt"
+    chunks, _ = process_document(doc["file_path"], file_type)
+    
+    # An earlier attempt cut short by another crash may have left rows behind
+    with db_lock, db:
+        db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+    create_vector_store(doc_id, chunks)
+    with db_lock, db:
+        db.execute("UPDATE documents SET status = 'processed' WHERE id = ?", (doc_id,))
+
+async def ingest_document(file: UploadFile) -> DocumentResponse:
+    """Save, process and index a single uploaded file"""
+    async with ingest_semaphore:
         # Generate unique document ID
         doc_id = str(uuid.uuid4())
         
@@ -184,22 +952,36 @@ async def upload_document(file: UploadFile = File(...)):
         file_extension = file.filename.split('.')[-1].lower()
         file_path = os.path.join(UPLOAD_DIR, f"{doc_id}.{file_extension}")
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_bytes = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
+                file_bytes += len(chunk)
         
         # Process document
         file_type = "pdf" if file_extension == "pdf" else "txt"
-        chunks, full_text = process_document(file_path, file_type)
+        chunks, full_text = await run_blocking(process_document, file_path, file_type)
         
-        # Create vector store
-        vectorstore = create_vector_store(doc_id, chunks)
+        # Persist the extracted text and analyze it once; the text never
+        # changes after upload, so /analyze serves the stored result
+        text_path = full_text_path(doc_id)
+        async with aiofiles.open(text_path, "w", encoding="utf-8", newline="") as buffer:
+            await buffer.write(full_text)
+        analysis = await run_blocking(analyze_full_text, text_path, full_text)
+        
+        # Embed chunks (batched with other in-flight uploads) and add them
+        # to the shared vector store
+        chunk_embeddings = None
+        if chunks:
+            chunk_embeddings = await embedding_batcher.embed([c.page_content for c in chunks])
+        await run_blocking(create_vector_store, doc_id, chunks, chunk_embeddings)
         
         # Calculate stats
-        word_count = len(full_text.split())
-        file_size = os.path.getsize(file_path) / 1024  # KB
+        word_count = analysis["word_count"]
+        file_size = file_bytes / 1024  # KB
         
         # Store document metadata
-        documents_db[doc_id] = {
+        doc = {
             "id": doc_id,
             "name": file.filename,
             "file_path": file_path,
@@ -207,70 +989,119 @@ async def upload_document(file: UploadFile = File(...)):
             "word_count": word_count,
             "size": f"{file_size:.2f} KB",
             "status": "processed",
-            "vectorstore": vectorstore,
-            "full_text": full_text
+            "full_text_path": text_path,
+            "analysis": json.dumps(analysis)
         }
+        await run_blocking(save_document, doc)
         
-        return DocumentResponse(**documents_db[doc_id])
+        return DocumentResponse(**doc)
+
+# API Endpoints
+
+@app.on_event("startup")
+def warm_query_cache():
+    load_query_cache()
+
+@app.on_event("startup")
+def reindex_stale_documents():
+    with db_lock:
+        rows = db.execute("SELECT id FROM documents WHERE status = 'reindexing'").fetchall()
+    for row in rows:
+        executor.submit(reindex_document, row["id"])
+
+@app.on_event("shutdown")
+def persist_index():
+    save_index()
+
+@app.get("/")
+def root():
+    return {
+        "message": "Document Intelligence API",
+        "version": "1.0.0",
+        "endpoints": ["/upload", "/upload_batch", "/query", "/documents", "/analyze/{doc_id}"]
+    }
+
+@app.post("/upload", response_model=DocumentResponse)
+async def upload_document(file: UploadFile = File(...)):
+    """Upload and process a document"""
+    try:
+        return await ingest_document(file)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/upload_batch", response_model=List[BatchUploadResult])
+async def upload_documents(files: List[UploadFile] = File(...)):
+    """Upload and process several documents concurrently
+    
+    Files succeed or fail independently; each result carries either the
+    stored document or the error for that file.
+    """
+    results = await asyncio.gather(
+        *[ingest_document(file) for file in files],
+        return_exceptions=True
+    )
+    
+    return [
+        BatchUploadResult(filename=file.filename, error=str(result))
+        if isinstance(result, BaseException)
+        else BatchUploadResult(filename=file.filename, document=result)
+        for file, result in zip(files, results)
+    ]
+
 @app.post("/query", response_model=QueryResponse)
 async def query_document(request: QueryRequest):
-    """Query a document using RAG (Retrieval Augmented Generation)"""
+    """Query a document using RAG (Retrieval Augmented Generation)
+    
+    Cached answers are returned as a QueryResponse. Otherwise the answer is
+    streamed as newline-delimited JSON: {"token": ...} lines as the LLM
+    generates them, followed by the complete QueryResponse.
+    """
     try:
-        if request.document_id not in documents_db:
+        doc = await run_blocking(get_document, request.document_id)
+        if doc is None:
             raise HTTPException(status_code=404, detail="Document not found")
+        if doc["status"] == "reindexing":
+            raise HTTPException(status_code=503, detail="Document is being re-indexed")
         
-        doc = documents_db[request.document_id]
-        vectorstore = doc["vectorstore"]
-        
-        # Create QA chain with custom prompt
-        prompt_template = """Use the following pieces of context to answer the question at the end. 
-        If you don't know the answer, just say that you don't know, don't try to make up an answer.
+        # Exact cache hit: identical (normalized) question on the same document
+        norm_query = normalize_query(request.query)
+        cache_key = query_cache_key(request.document_id, norm_query)
+        if cache_key in query_cache:
+            query_cache.move_to_end(cache_key)
+            return query_cache[cache_key]
         
-        Context: {context}
-        
-        Question: {question}
-        
-        Answer:"""
-        
-        PROMPT = PromptTemplate(
-            template=prompt_template, 
-            input_variables=["context", "question"]
+        # Semantic cache hit: a near-identical question was already answered
+        query_embedding = np.asarray(
+            await run_blocking(embeddings.embed_query, norm_query), dtype=np.float32
         )
+        cached_response = lookup_semantic_cache(request.document_id, query_embedding)
+        if cached_response is not None:
+            return cached_response
         
-        # Initialize LLM (using OpenAI - you can switch to local models)
-        llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.3,
-            openai_api_key=OPENAI_API_KEY
+        # Retrieve context with the query embedding computed for the cache lookup
+        source_documents, scores = await run_blocking(
+            search_chunks, request.document_id, query_embedding
         )
+        confidence = retrieval_confidence(scores)
         
-        # Alternative: Use local model with Ollama or HuggingFace
-        # from langchain_community.llms import Ollama
-        # llm = Ollama(model="llama2")
+        # Nothing in the document is close to the question: answer without an
+        # LLM call rather than invite a hallucinated answer
+        if confidence < MIN_ANSWER_CONFIDENCE:
+            response = QueryResponse(
+                answer=LOW_CONFIDENCE_ANSWER,
+                source_documents=[doc.page_content[:200] + "..." for doc in source_documents],
+                confidence=confidence
+            )
+            await store_query_cache(request.document_id, cache_key, query_embedding, response)
+            return response
         
-        # Create QA chain
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": PROMPT}
-        )
-        
-        # Get answer
-        result = qa_chain({"query": request.query})
-        
-        # Extract source documents
-        source_docs = [doc.page_content[:200] + "..." for doc in result.get("source_documents", [])]
-        
-        return QueryResponse(
-            answer=result["result"],
-            source_documents=source_docs,
-            confidence=0.85  # Can be calculated based on retrieval scores
+        return StreamingResponse(
+            stream_answer(
+                request.document_id, cache_key, query_embedding,
+                request.query, source_documents, confidence
+            ),
+            media_type="application/x-ndjson"
         )
     
     except Exception as e:
@@ -279,48 +1110,40 @@ async def query_document(request: QueryRequest):
 @app.get("/documents", response_model=List[DocumentResponse])
 async def list_documents():
     """Get list of all uploaded documents"""
-    docs = []
-    for doc_id, doc in documents_db.items():
-        docs.append(DocumentResponse(
-            id=doc["id"],
-            name=doc["name"],
-            upload_date=doc["upload_date"],
-            word_count=doc["word_count"],
-            size=doc["size"],
-            status=doc["status"]
-        ))
-    return docs
+    return await run_blocking(list_document_rows)
 
 @app.get("/analyze/{document_id}", response_model=AnalysisResponse)
 async def analyze_document(document_id: str):
     """Get detailed analysis of a document"""
-    if document_id not in documents_db:
+    doc = await run_blocking(get_document, document_id)
+    if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc = documents_db[document_id]
-    analysis = analyze_text(doc["full_text"])
+    if doc["analysis"]:
+        return AnalysisResponse(**json.loads(doc["analysis"]))
+    
+    # Documents uploaded before analyses were stored: compute once and keep it
+    analysis = await run_blocking(analyze_full_text, doc["full_text_path"])
+    await run_blocking(save_analysis, document_id, analysis)
     
     return AnalysisResponse(**analysis)
 
 @app.delete("/documents/{document_id}")
 async def delete_document(document_id: str):
     """Delete a document"""
-    if document_id not in documents_db:
+    doc = await run_blocking(get_document, document_id)
+    if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    doc = documents_db[document_id]
-    
-    # Delete file
-    if os.path.exists(doc["file_path"]):
-        os.remove(doc["file_path"])
     
-    # Delete vector store
-    vector_dir = os.path.join(VECTOR_DB_DIR, document_id)
-    if os.path.exists(vector_dir):
-        shutil.rmtree(vector_dir)
+    # Delete files
+    for path in (doc["file_path"], doc["full_text_path"]):
+        if os.path.exists(path):
+            os.remove(path)
     
     # Remove from database
-    del documents_db[document_id]
+    await run_blocking(remove_document, document_id)
+    clear_query_cache(document_id)
     
     return {"message": "Document deleted successfully"}
 
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numba")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import analysis
+from analysis import analyze_text, count_tokens, count_tokens_jit
+
+ASCII_TEXT = """The Quarterly Report was GOOD, and the outlook is great!
+Some results were bad; others (a few) were terrible. Excellent work overall.
+
+Amazing progress: "wonderful" feedback, positive reviews, and a poor start
+that turned out not so awful. Horrible weather. Negative? Good good GOOD."""
+
+# Non-ASCII letters and case, contractions, numbers, hyphens, punctuation-only
+# runs and every non-ASCII whitespace character str.split() recognizes
+UNICODE_TEXT = (
+    "Über über ÜBER café Café naïve ΣΟΦΙΑ σοφια don't Don't 42 3.14 well-known "
+    "... (good) «bad» straße STRASSE 東京 東京\xa0nbsp\u0085nel\u1680ogham "
+    + "".join(f"w{i}{chr(c)}" for i, c in enumerate(
+        [*range(0x2000, 0x200b), 0x2028, 0x2029, 0x202f, 0x205f, 0x3000]
+    ))
+    + "end\x1cfs\x1fus\ttab\x0bvt"
+)
+
+@pytest.mark.parametrize("text", [ASCII_TEXT, UNICODE_TEXT, "", " \n\t ", "..."])
+def test_jit_counter_matches_counter(text):
+    assert count_tokens_jit(text.encode("utf-8")) == count_tokens(text)
+
+def test_sentiment_counts():
+    _, pos_count, neg_count = count_tokens_jit(ASCII_TEXT.encode("utf-8"))
+    
+    assert (pos_count, neg_count) == (9, 6)
+
+def test_keywords_do_not_change_above_threshold(monkeypatch):
+    text = (UNICODE_TEXT + "\n\n" + ASCII_TEXT) * 20
+    expected = analyze_text(text)
+    
+    monkeypatch.setattr(analysis, "LARGE_TEXT_THRESHOLD", 0)
+    assert analyze_text(text) == expected
+    assert analyze_text(text, text.encode("utf-8")) == expected
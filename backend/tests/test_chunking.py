@@ -0,0 +1,80 @@
+import os
+import random
+import sys
+
+import pytest
+
+pytest.importorskip("numba")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chunking import chunk_spans
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+WORDS = ["alpha", "beta", "gamma", "delta", "épsilon", "zeta", "eta", "theta",
+         "iota", "kappa", "lambda", "mu", "omicron", "straße", "東京"]
+
+def make_text(seed: int, words: int, sentences: bool) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(words):
+        parts.append(rng.choice(WORDS))
+        if sentences and rng.random() < 0.08:
+            parts[-1] += "."
+        if sentences and rng.random() < 0.01:
+            parts[-1] += "\n\n"
+    return " ".join(parts)
+
+def split(text: str):
+    return [text[start:end].strip() for start, end in chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP)]
+
+@pytest.mark.parametrize("sentences", [False, True])
+def test_chunks_hold_whole_words(sentences):
+    text = make_text(1, 20_000, sentences)
+    vocabulary = set(text.split())
+    
+    for chunk in split(text):
+        assert len(chunk) <= CHUNK_SIZE
+        assert set(chunk.split()) <= vocabulary
+
+@pytest.mark.parametrize("sentences", [False, True])
+def test_chunks_cover_text_with_overlap(sentences):
+    text = make_text(2, 20_000, sentences)
+    spans = chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP)
+    
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for (prev_start, prev_end), (start, end) in zip(spans, spans[1:]):
+        assert prev_start < start < prev_end < end
+
+def test_chunks_end_at_sentence_or_line_breaks():
+    text = make_text(3, 20_000, sentences=True)
+    spans = chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP)
+    
+    assert all(text[end - 1] in ".\n" for _, end in spans[:-1])
+
+def test_long_words_are_cut_with_overlap():
+    text = "x" * 2500
+    
+    assert chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP) == [(0, 1000), (800, 1800), (1600, 2500)]
+
+@pytest.mark.parametrize("sentences", [False, True])
+def test_matches_recursive_splitter(sentences):
+    text_splitter = pytest.importorskip("langchain.text_splitter")
+    splitter = text_splitter.RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len
+    )
+    text = make_text(4, 20_000, sentences)
+    vocabulary = set(text.split())
+    
+    fast = split(text)
+    recursive = splitter.split_text(text)
+    
+    # Similar granularity (windows here also end at periods, so slightly
+    # fewer chunks), and like the recursive splitter never a partial word
+    assert abs(len(fast) - len(recursive)) <= 0.15 * len(recursive)
+    for chunk in fast + recursive:
+        assert set(chunk.split()) <= vocabulary
+    assert set(" ".join(fast).split()) == set(" ".join(recursive).split()) == vocabulary